@@ -0,0 +1,51 @@
+"""
+Overview and Description
+========================
+This Python module optionally compiles the Ram parser with Cython.
+The .py files remain the only source; compiling them in place with
+
+~ % python build_parser.py
+
+produces extension modules next to them that Python imports ahead of
+the .py files. This is a build script, not a package installer: Ram is
+still run from the repository with main.py. If the build is skipped,
+Ram runs unchanged from the pure Python sources.
+
+Copyright and Usage Information
+===============================
+All forms of distribution of this code, whether as given or with any changes,
+are expressly prohibited.
+This file is Copyright (c) 2021 Will Assad, Zain Lakhani,
+Ariel Chouminov, Ramya Chawla.
+"""
+import sys
+
+from setuptools import setup
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    cythonize = None
+
+# Parser modules compiled to C. Everything else stays interpreted.
+PARSER_MODULES = ['parsing/parsing.py', 'parsing/parse_variables.py', 'parsing/parse_linear.py']
+
+# Bounds and wraparound checks stay on: the parser indexes with [-1] throughout
+# and relies on IndexError to reject malformed lines, so turning them off would
+# trade a RamException for undefined behaviour. The type annotations describe
+# intent rather than exact types (lexify passes nested lists where list[str] is
+# annotated), so Cython must not enforce them at run time.
+COMPILER_DIRECTIVES = {'annotation_typing': False}
+
+
+if __name__ == '__main__':
+    if cythonize is None:
+        sys.exit('Cython is required to build the parser, e.g. pip install cython')
+
+    # always build in place; the modules are imported from the repository
+    setup(
+        name='ram-parser',
+        script_args=['build_ext', '--inplace'],
+        ext_modules=cythonize(PARSER_MODULES, language_level=3,
+                              compiler_directives=COMPILER_DIRECTIVES),
+    )
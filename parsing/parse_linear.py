@@ -11,9 +11,12 @@ are expressly prohibited.
 This file is Copyright (c) 2021 Will Assad, Zain Lakhani,
 Ariel Chouminov, Ramya Chawla.
 """
+from functools import lru_cache
 from typing import Union
 
 OPERATORS = ('+', '-', '/', '*', 'not', 'or', 'and', 'is')
+# maximum number of distinct lines/expressions memoized by the parser
+CACHE_SIZE = 4096
 
 
 def pedmas(sequence: list[str]) -> list[Union[str, list]]:
@@ -80,6 +83,13 @@ def lexify(line: str) -> list[Union[str, list]]:
        >>> lexify('true or false and true')
        [['true', 'or', 'false'], 'and', 'true']
     """
+    # results are memoized, so hand each caller its own mutable copy
+    return thaw_tokens(lexify_frozen(line))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def lexify_frozen(line: str) -> tuple:
+    """ Return lexify(line) as nested tuples so that it can be memoized. """
     # format whitespace around binary operators
     line = format_whitespace(line)
     blocks = identify_bracket_blocks(line)
@@ -87,7 +97,7 @@ def lexify(line: str) -> list[Union[str, list]]:
 
     for block in blocks:
         if isinstance(block, list):
-            lexed_so_far += [lexify(block[0])]
+            lexed_so_far.append(lexify_frozen(block[0]))
         else:
             assert isinstance(block, str)
             to_add = block.split()
@@ -102,7 +112,26 @@ def lexify(line: str) -> list[Union[str, list]]:
             else:
                 lexed_so_far.extend(pedmas(to_add[:end_index]) + to_add[end_index:])
 
-    return lexed_so_far
+    return freeze_tokens(lexed_so_far)
+
+
+def freeze_tokens(tokens: Union[list, tuple]) -> tuple:
+    """ Return a copy of a nested token list with every list made a tuple.
+
+    >>> freeze_tokens(['5', '+', ['9', '*', '2']])
+    ('5', '+', ('9', '*', '2'))
+    """
+    return tuple(freeze_tokens(token) if isinstance(token, (list, tuple)) else token
+                 for token in tokens)
+
+
+def thaw_tokens(tokens: tuple) -> list:
+    """ Return a copy of a nested token tuple with every tuple made a list.
+
+    >>> thaw_tokens(('5', '+', ('9', '*', '2')))
+    ['5', '+', ['9', '*', '2']]
+    """
+    return [thaw_tokens(token) if isinstance(token, tuple) else token for token in tokens]
 
 
 def format_whitespace(text: str) -> Union[str, list]:
@@ -11,13 +11,14 @@ are expressly prohibited.
 This file is Copyright (c) 2021 Will Assad, Zain Lakhani,
 Ariel Chouminov, Ramya Chawla.
 """
+from functools import lru_cache
 
 import verify
 
 try:
-    from .parse_linear import lexify
+    from .parse_linear import CACHE_SIZE, freeze_tokens, lexify
 except ImportError:
-    from parse_linear import lexify
+    from parse_linear import CACHE_SIZE, freeze_tokens, lexify
 
 from syntaxtrees.abs import EmptyExpr, Expr
 from syntaxtrees.datatypes import Bool, InputNumber, InputText, Name, Num, String
@@ -84,18 +85,28 @@ def parse_expression(values: list) -> Expr:
     >>> exp.evaluate({})
     12.0
     """
+    # expressions are memoized on an immutable copy of values
+    return parse_frozen_expression(freeze_tokens(values))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_frozen_expression(values: tuple) -> Expr:
+    """ Parse an expression whose nested lists have been made tuples.
+        The parsed Expr is shared between identical expressions and
+        must not be mutated.
+    """
     # verify that every other value is a recognized operator
     proceed = verify.verify_keywords(OPERATORS, values)
 
     if proceed is not True:
         # invalid keyword, abort parsing
         raise RamSyntaxOperatorException(proceed)
-    elif values == []:
+    elif values == ():
         # Base case: values is empty
         return EmptyExpr()
-    elif len(values) == 1 and isinstance(values[0], list):
+    elif len(values) == 1 and isinstance(values[0], tuple):
         # Values is a list containing one list and must recurse
-        return parse_expression(values[0])
+        return parse_frozen_expression(values[0])
     elif len(values) == 1:
         # Looking at a single value such as String, Num, Boolean, Name
         return get_expression_single_value(values[0])
@@ -104,24 +115,24 @@ def parse_expression(values: list) -> Expr:
         return handle_multiple_values(values)
 
 
-def handle_multiple_values(values: list) -> Expr:
+def handle_multiple_values(values: tuple) -> Expr:
     """Return a parsed expression of a single value in values. """
     operator = values[1]  # prepare for operator
 
     if operator in {'*', '/', '+', '-'}:
         # create BinOp around operator next_val
         return BinOp(
-            parse_expression(values[0:1]), operator,
-            parse_expression(values[2:]))
+            parse_frozen_expression(values[0:1]), operator,
+            parse_frozen_expression(values[2:]))
     elif operator in {'or', 'and'}:
         # create BoolOp around operator next_val
         return BoolOp(
-            operator, [parse_expression(values[0:1]),
-                       parse_expression(values[2:])])
+            operator, [parse_frozen_expression(values[0:1]),
+                       parse_frozen_expression(values[2:])])
     elif operator == 'is':
         # create BoolEq around operator
-        return BoolEq(parse_expression(values[0:1]),
-                      parse_expression(values[2:]))
+        return BoolEq(parse_frozen_expression(values[0:1]),
+                      parse_frozen_expression(values[2:]))
     else:
         # next_val not in OPERATORS. This branch should not be
         # entered given verify_keywords has been called on values.
@@ -0,0 +1,36 @@
+# Cython declarations augmenting parsing.py, used only by build_parser.py.
+# parsing.py stays the single source; when compiled, Line and Block become
+# extension types with typed attributes and cpdef methods.
+
+cdef class Line:
+    cdef public str line
+    cdef public int number
+    cdef public list strs
+    cdef public str keyword
+
+    cpdef list get_line_as_list(self)
+    cpdef parse(self)
+
+
+cdef class Block:
+    cdef public list block
+    cdef public str keyword
+    cdef public list contents
+    cdef public list body
+    cdef public str header
+    cdef public list header_tokens
+
+    cpdef evaluate_line(self)
+    cpdef parse(self)
+
+
+cdef class LoopBlock(Block):
+    cpdef parse(self)
+
+
+cdef class FunctionBlock(Block):
+    cpdef parse(self)
+
+
+cdef class IfBlock(Block):
+    cpdef parse(self)
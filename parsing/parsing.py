@@ -10,8 +10,10 @@ are expressly prohibited.
 This file is Copyright (c) 2021 Will Assad, Zain Lakhani,
 Ariel Chouminov, Ramya Chawla.
 """
-from typing import Any
 import enum
+import re
+import sys
+from typing import Optional
 
 try:
     from .parse_variables import parse_expression, parse_variable
@@ -23,12 +25,22 @@ except ImportError:
 from syntaxtrees.abs import EmptyExpr, Statement, Expr
 from syntaxtrees.statements import Display, Function, Loop, If
 
-from exceptions import RamException, RamSyntaxException, RamSyntaxKeywordException, \
-    RamBlockException
+from exceptions import RamException, RamSyntaxException, RamSyntaxKeywordException
 
 # Globals
 VAR_TYPES = ('integer', 'text')
 OPERATORS = ('+', '-', '/', '*', 'not', 'or', 'and')
+ASSIGN_KEYWORDS = frozenset({'set', 'reset', 'send'})
+EXPRESSION_KEYWORDS = frozenset({'display', 'call'})
+PARAMETER_CHARS = re.compile(r'[ ()]')
+IF_PREFIX = re.compile(r'^if ')
+ELSE_PREFIX = re.compile(r'^\} else ')
+LOOP_TO = re.compile(r'\bto\b')
+
+# kind of a parsed item, read from its class attribute 'kind'.
+# Brace lines stay plain tuples and are told apart with type(item) is tuple.
+LINE_KIND = 0
+BLOCK_KIND = 1
 
 
 class BlockEnums(enum.Enum):
@@ -54,12 +66,15 @@ class Line:
     number: int
     strs: list[str]
     keyword: str
+    kind = LINE_KIND
+    __slots__ = ('line', 'number', 'strs', 'keyword')
 
     def __init__(self, line: str, number: int) -> None:
         self.line = line
         self.strs = self.get_line_as_list()
         self.number = number
-        self.keyword = self.strs[0]
+        # interned so keyword lookups can match on identity
+        self.keyword = sys.intern(self.strs[0])
 
     def get_line_as_list(self) -> list[str]:
         """ Get a line as a list of strings.
@@ -73,23 +88,23 @@ class Line:
         >>> line3.get_line_as_list()
         ['display', ['true', 'or', 'false']]
         """
-        split_list = self.line.split()
+        split_list = self.line.split(None, 1)
         if len(split_list) < 2:
             # if the length of split line is less than two,
             # only a keyword is detected and nothing else.
             raise RamSyntaxException('Error parsing.')
 
         # keyword of line such as 'display', 'set', etc.
-        keyword = split_list[0]
-
-        if keyword == 'set' or keyword == 'reset' or keyword == 'send':
-            # split into list of first 4 words and lexify the rest
-            line_so_far = self.line.split()[:4]
-            line_so_far += [lexify(' '.join(self.line.split()[4:]))]
-        elif keyword == 'display' or keyword == 'call':
+        keyword, rest = split_list
+
+        if keyword in ASSIGN_KEYWORDS:
+            # split into list of first 4 words and lexify the rest,
+            # without splitting the rest into words first
+            words = rest.split(None, 3)
+            line_so_far = [keyword] + words[:3] + [lexify(words[3] if len(words) == 4 else '')]
+        elif keyword in EXPRESSION_KEYWORDS:
             # split into list of first word and lexify the rest
-            line_so_far = self.line.split()[:1]
-            line_so_far += [lexify(' '.join(self.line.split()[1:]))]
+            line_so_far = [keyword, lexify(rest)]
         else:
             raise RamSyntaxKeywordException(keyword)
 
@@ -110,32 +125,24 @@ class Line:
         55.0
         """
         try:
-            if self.keyword == 'set' or self.keyword == 'reset':
-                # variable assignment
-                return parse_variable(self.line, self.strs[1], self.strs[2:])
-            elif self.keyword == 'display':
-                # display (print) statement
-                return parse_display(self.line, self.strs[1:])
-            elif self.keyword == 'send':
-                # function return statement
-                return parse_return(self.strs)
-            elif self.keyword == 'call':
-                # function call statement
-                return parse_expression(self.strs[1:])
-            else:
+            line_parser = LINE_PARSERS.get(self.keyword)
+            if line_parser is None:
                 # keyword not recognized
                 raise RamSyntaxKeywordException(self.keyword)
+
+            return line_parser(self)
         except RamException as e:
             raise RamException(self.line, self.number, e)
 
 
 class Block:
-    """ A block of Ram code to parse.
+    """ A block of Ram code to parse. Blocks are created with make_block,
+        which picks the subclass matching the block's keyword.
 
     Instance Attributes:
      - block: a list of tuples, lines, and other blocks that make up this block.
 
-    >>> block1 = Block([('loop with x from 0 to 4 {', 2),
+    >>> block1 = make_block([('loop with x from 0 to 4 {', 2),
     >>> ... Line('display x', 3), ('}', 4)])
     >>> block_statement = block1.parse()
     >>> block_statement.evaluate({})
@@ -145,9 +152,9 @@ class Block:
     3
     4
 
-    >>> block2 = Block([('if (var1) is (0) {', 1), Line('set integer x to 4 * 3', 2),
+    >>> block2 = make_block([('if (var1) is (0) {', 1), Line('set integer x to 4 * 3', 2),
     >>> ... Line('display "The End"', 3), ('} else if (var1) is (15) {', 4),
-    >>> ... Block([('if (y + 2) is (3) {', 5), Line('reset integer y to 2', 6),
+    >>> ... make_block([('if (y + 2) is (3) {', 5), Line('reset integer y to 2', 6),
     >>> ... Line('display "Reset"', 7), ('}', 8)]), Line('display "Hello World!"', 9),
     >>> ... ('}', 10) ])
     >>> block_statement = block2.parse()
@@ -155,74 +162,55 @@ class Block:
     Reset
     Hello World!
 
-    >>> block2 = Block([('if (var1) is (0) {', 1), Line('set integer x to 4 * 3', 2),
+    >>> block2 = make_block([('if (var1) is (0) {', 1), Line('set integer x to 4 * 3', 2),
     >>> ... Line('display x', 3), ('} else if (var1) is (15) {', 4),
-    >>> ... Block([('if (y) is (x) {', 5), Line('reset integer y to 2', 6),
+    >>> ... make_block([('if (y) is (x) {', 5), Line('reset integer y to 2', 6),
     >>> ... Line('display y', 7), ('}', 8)]), Line('display 5', 9),
     >>> ... ('}', 10)])
 
-    >>> b = Block([('loop with j from (15) to (var1) {', 1),
-    >>> ... Block([('loop with k from (1) to (2) {', 2),
+    >>> b = make_block([('loop with j from (15) to (var1) {', 1),
+    >>> ... make_block([('loop with k from (1) to (2) {', 2),
     >>> ... Line('display j + k', 3), ('}', 4)]),
     >>> ... Line('display j', 5), ('}', 6)])
     """
     block: list  # list of Line, tuple, and/or Block
+    header: str  # first line of the block up to the opening brace
+    header_tokens: list[str]  # header split into words
+    kind = BLOCK_KIND
+    __slots__ = ('block', 'keyword', 'contents', 'body', 'header', 'header_tokens')
 
-    def __init__(self, block: list) -> None:
+    def __init__(self, block: list, header: str, header_tokens: list[str]) -> None:
         self.block = block
-        self.keyword = block[0][0].split()[0]
+        self.header = header
+        self.header_tokens = header_tokens
+        self.keyword = sys.intern(header_tokens[0])
+        self.body = []
         self.contents = []
-        self.child_type = None
-
-        if self.keyword == 'loop':
-            self.child_type = BlockEnums.LoopType
-        elif self.keyword == 'new':
-            self.child_type = BlockEnums.FunctionType
-        elif self.keyword == 'if':
-            self.child_type = BlockEnums.IfType
-        else:
-            # keyword is not recognized
-            raise RamSyntaxKeywordException(self.keyword)
 
-        # create the relevant child instance
-        parsed_block = self.make_child(keyword=self.keyword, block=self.block)
-        self.__class__ = parsed_block.__class__
-        self.__dict__ = parsed_block.__dict__
+        self.evaluate_line()
 
     def evaluate_line(self) -> None:
         """ Parse all children blocks and/or lines """
-        created_index, self.contents = [], [[]]
+        created_index, contents = [], [[]]
+        self.contents = contents
+        # bound append of the group currently being filled
+        add_to_group = contents[-1].append
 
         for item in self.block[1:]:
-            if isinstance(item, tuple) and item[0].strip() != '}':
-                self.contents.append([item])
-                created_index = []
-            elif isinstance(item, tuple):
-                created_index = None
-            elif isinstance(item, Block):
-                # item is another Block, recursively parse
-                self.contents[-1].append(item.parse())
-            elif created_index is not None:
-                # item is a Line based on precondition
-                assert isinstance(item, Line)
-                self.contents[-1].append(item.parse())
+            if type(item) is tuple:
+                if item[0].strip() != '}':
+                    group = [item]
+                    contents.append(group)
+                    add_to_group = group.append
+                    created_index = []
+                else:
+                    created_index = None
+            elif created_index is not None or item.kind == BLOCK_KIND:
+                # item is a Line, or another Block to recursively parse
+                add_to_group(item.parse())
             else:
                 # item is a Line based on precondition
-                assert isinstance(item, Line)
-                self.contents.append(item.parse())
-
-    def make_child(self, **kwargs) -> Any:
-        """ Create new block subclass based on parent type
-        """
-        if self.child_type is None:
-            raise RamSyntaxKeywordException(self.keyword)
-
-        if self.child_type == BlockEnums.LoopType:
-            return LoopBlock(**kwargs)
-        elif self.child_type == BlockEnums.IfType:
-            return IfBlock(**kwargs)
-        elif self.child_type == BlockEnums.FunctionType:
-            return FunctionBlock(**kwargs)
+                contents.append(item.parse())
 
     def parse(self) -> Statement:
         """ Parse a block of Ram code. """
@@ -231,33 +219,30 @@ class Block:
 
 class LoopBlock(Block):
     """ A block of Ram code to parse that evaluates to a loop. """
-    def __init__(self, **kwargs) -> None:
-        if 'keyword' not in kwargs or 'block' not in kwargs:
-            raise RamBlockException('Undefined block created')
-        self.block = kwargs.get('block')
-        self.header = self.block[0][0][0: self.block[0][0].index('{')]
-        self.keyword = self.header.split()[0]
-        self.body = []
-        self.contents = []
-
-        self.evaluate_line()
+    __slots__ = ()
 
     def parse(self) -> Statement:
         """ Parse a loop block of Ram code. """
-        header_list = self.header.split()
-        loop_values = self.header.split('from ')[1]
+        header_list = self.header_tokens
 
-        expression_normal = loop_values.split('to')
-        left, right = lexify(expression_normal[0]), lexify(expression_normal[1])
+        # the text after 'from', split at the first standalone 'to' so that
+        # both '(1)to(5)' and names such as 'total' are handled
+        header_parts = self.header.split(None, 4)
+        bounds = LOOP_TO.split(header_parts[4], maxsplit=1) if len(header_parts) == 5 else []
 
         if header_list[1] != 'with':
             raise RamSyntaxKeywordException(header_list[1])
         elif header_list[3] != 'from':
             raise RamSyntaxKeywordException(header_list[3])
+        elif len(bounds) != 2:
+            raise RamSyntaxException('Loop header cannot be parsed.')
         else:
             # get the name of the loop variable
             var_name = header_list[2]
 
+            # lexify the start and stop expressions either side of 'to'
+            left, right = lexify(bounds[0]), lexify(bounds[1])
+
             # parse the start and stop conditions and return Loop object
             start = parse_expression(left)
             stop = parse_expression(right)
@@ -269,20 +254,11 @@ class FunctionBlock(Block):
     """ A block of Ram code to parse,
         that evaluates to a Function
     """
-    def __init__(self, **kwargs) -> None:
-        if 'keyword' not in kwargs or 'block' not in kwargs:
-            raise RamBlockException('Undefined block created')
-        self.block = kwargs.get('block')
-        self.header = self.block[0][0][0: self.block[0][0].index('{')]
-        self.keyword = self.header.split()[0]
-        self.body = []
-        self.contents = []
-
-        self.evaluate_line()
+    __slots__ = ()
 
     def parse(self) -> Statement:
         """ Parse a function block of Ram code. """
-        header_list = self.header.split()
+        header_list = self.header_tokens
 
         if len(header_list) != 5:
             # function statement not in correct form, cannot parse.
@@ -293,13 +269,14 @@ class FunctionBlock(Block):
             raise RamSyntaxKeywordException(header_list[3])
         else:
             # get a list of the parameter names in the form [<param1>, <param2>]
-            param_names = header_list[4].replace(' ', '').replace(
-                '(', '').replace(')', '').split(',')
+            param_names = PARAMETER_CHARS.sub('', header_list[4]).split(',')
 
             # get the name of the function and the return expression and return Function
             function_name = header_list[2]
-            if isinstance(self.block[-2], Line) and 'send' in self.block[-2].line:
-                rturn_expr = parse_return(self.block[-2].line.split())
+            last_item = self.block[-2]
+            if type(last_item) is not tuple and last_item.kind == LINE_KIND \
+                    and 'send' in last_item.line:
+                rturn_expr = parse_return(last_item.line.split())
                 self.contents[0].pop()
             else:
                 rturn_expr = EmptyExpr()
@@ -311,21 +288,12 @@ class IfBlock(Block):
     """ A block of Ram code to parse,
         That evaluates to a If
     """
-    def __init__(self, **kwargs) -> None:
-        if 'keyword' not in kwargs or 'block' not in kwargs:
-            raise RamBlockException('Undefined block created')
-        self.block = kwargs.get('block')
-        self.header = self.block[0][0][0: self.block[0][0].index('{')]
-        self.keyword = self.header.split()[0]
-        self.body = []
-        self.contents = []
-
-        self.evaluate_line()
+    __slots__ = ()
 
     def parse(self) -> Statement:
         """ Parse an if block of Ram code. """
-        header_list = self.header.split()
-        expression_normal = self.header.replace('if ', '').split('is')
+        header_list = self.header_tokens
+        expression_normal = IF_PREFIX.sub('', self.header, count=1).split('is')
         expression_left = lexify(expression_normal[0])
 
         if len(expression_normal) > 1:
@@ -337,7 +305,7 @@ class IfBlock(Block):
         if_actions, actions = [], []
 
         for i in range(1, len(self.block)):
-            if isinstance(self.block[i], tuple):
+            if type(self.block[i]) is tuple:
                 else_exists, else_item, else_index = True, self.block[i], i
                 break
 
@@ -352,14 +320,13 @@ class IfBlock(Block):
                 raise RamSyntaxKeywordException(header_list[1])
 
             new_block = self.block[else_index:]
-            x = new_block[0][0].replace("} else ", "")
+            x = ELSE_PREFIX.sub('', new_block[0][0], count=1)
             new_block[0] = (x, new_block[0][1])
 
-            return If([(expression, if_actions)], [IfBlock(block=new_block,
-                                                           keyword='if').parse()])
+            return If([(expression, if_actions)], [make_block(new_block).parse()])
         elif else_exists:
             for action in self.block[else_index + 1:]:
-                if isinstance(action, tuple):
+                if type(action) is tuple:
                     break
 
                 actions.append(action.parse())
@@ -367,6 +334,40 @@ class IfBlock(Block):
         return If([(expression, if_actions)], actions)
 
 
+# map each block keyword to the Block subclass that parses it
+BLOCK_CLASSES = {BlockEnums.LoopType.value: LoopBlock,
+                 BlockEnums.IfType.value: IfBlock,
+                 BlockEnums.FunctionType.value: FunctionBlock}
+
+
+def read_block_header(first_line: str) -> tuple[type, str, list[str]]:
+    """ Return the Block subclass for a block starting with first_line,
+        the header (first_line up to the opening brace) and the header
+        split into words, so that the header is only scanned once.
+    """
+    header = first_line[0: first_line.index('{')]
+    header_tokens = header.split()
+    block_class = BLOCK_CLASSES.get(header_tokens[0])
+
+    if block_class is None:
+        # keyword is not recognized
+        raise RamSyntaxKeywordException(header_tokens[0])
+
+    return block_class, header, header_tokens
+
+
+def make_block(block: list, block_header: Optional[tuple] = None) -> Block:
+    """ Create the Block subclass matching the keyword
+        on the first line of block. block_header is the result of
+        read_block_header for that line, if it was already read.
+    """
+    if block_header is None:
+        block_header = read_block_header(block[0][0])
+
+    block_class, header, header_tokens = block_header
+    return block_class(block, header, header_tokens)
+
+
 def parse_return(return_list: list[str]) -> Expr:
     """ Parse a return statement. """
     if len(return_list) != 3:
@@ -387,3 +388,31 @@ def parse_display(line: str, value: list[str]) -> Statement:
         return Display(parse_expression([line.replace('display ', '')]))
     else:
         return Display(parse_expression(value))
+
+
+def parse_variable_line(line: Line) -> Statement:
+    """ Parse a variable assignment line. """
+    return parse_variable(line.line, line.strs[1], line.strs[2:])
+
+
+def parse_display_line(line: Line) -> Statement:
+    """ Parse a display (print) line. """
+    return parse_display(line.line, line.strs[1:])
+
+
+def parse_return_line(line: Line) -> Expr:
+    """ Parse a function return line. """
+    return parse_return(line.strs)
+
+
+def parse_call_line(line: Line) -> Expr:
+    """ Parse a function call line. """
+    return parse_expression(line.strs[1:])
+
+
+# map each line keyword to the function that parses it
+LINE_PARSERS = {'set': parse_variable_line,
+                'reset': parse_variable_line,
+                'display': parse_display_line,
+                'send': parse_return_line,
+                'call': parse_call_line}
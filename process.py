@@ -13,35 +13,73 @@ are expressly prohibited.
 This file is Copyright (c) 2021 Will Assad, Zain Lakhani,
 Ariel Chouminov, Ramya Chawla.
 """
-from typing import Union
+import hashlib
+import importlib.machinery
+import io
+import locale
+import os
+import pickle
+import tempfile
+from functools import lru_cache
+from typing import Iterable, Optional, Union
 
-from syntaxtrees.abs import Module
-from parsing.parsing import Block, Line
+from syntaxtrees.abs import Module, Statement
+from parsing.parsing import Block, Line, make_block, read_block_header
 
 from exceptions import RamFileNotFoundException, RamGeneralException, RamException
 
+# Parsed modules are cached here, keyed by a hash of the Ram source together
+# with a hash of PARSER_SOURCES, so editing the parser invalidates the cache.
+# Only the CACHE_LIMIT most recently used entries are kept.
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ram')
+CACHE_LIMIT = 256
+PARSER_SOURCES = ('parsing', 'syntaxtrees', 'process.py', 'verify.py')
 
-def read_file_as_list(file_path: str) -> list[Union[Line, Block]]:
-    """ Read a file containing Ram code and return its contents
-        as a list of Blocks and Lines.
-    """
+
+def read_source(file_path: str) -> bytes:
+    """ Return the raw contents of a file containing Ram code. """
     try:
-        reader = open(file_path, 'r')
+        with open(file_path, 'rb') as reader:
+            return reader.read()
     except FileNotFoundError:
         # Raise exception if file is not found
         raise RamFileNotFoundException(file_path)
-    else:
-        # create a list of tuples containing each line and its line number.
-        lines = reader.readlines()
-        tupled_lines = [(lines[index].strip(), index + 1) for index in range(len(lines))]
 
-        return process_ram(tupled_lines)
 
+def read_file_as_list(file_path: str) -> list[Union[Line, Block]]:
+    """ Read a file containing Ram code and return its contents
+        as a list of Blocks and Lines.
+
+        Kept as a public wrapper around read_source and source_as_list;
+        main_parser calls those directly so the file is read only once.
+    """
+    return source_as_list(read_source(file_path))
+
+
+def source_as_list(source: bytes) -> list[Union[Line, Block]]:
+    """ Return the Ram code in source as a list of Blocks and Lines. """
+    # decode with the locale encoding and split lines with universal newlines,
+    # exactly as reading the file with open(file_path, 'r') would
+    text = source.decode(locale.getpreferredencoding(False))
+    reader = io.StringIO(text, newline=None)
+
+    # pair each line with its line number, skipping empty lines and comments.
+    # The whole source is already in memory, but no separate list of its
+    # lines is built before create_blocks consumes them.
+    file_lines = ((line, number) for number, line in enumerate(map(str.strip, reader), 1)
+                  if line and line[0] != '%')
+
+    return create_blocks(file_lines)
 
-def process_ram(file_lines: list) -> list[Union[Line, Block]]:
-    """ Takes in the lines of a Ram file as a list of tuples
-        in the form [(<line>, <line_number>), ...]
-        and returns a list that correctly nests blocks.
+
+def create_blocks(file_lines: Iterable[tuple[str, int]]) -> list[Union[Line, Block]]:
+    """ Takes in the lines of a Ram file as tuples in the form
+        (<line>, <line_number>) and returns a list that correctly nests blocks.
+        Open blocks are kept on a stack as their header line together
+        with the contents collected for them so far, so nesting needs
+        no recursion and each Block is only built once it is complete.
+        Block headers are still checked as soon as they are read, so
+        errors are reported in the order they appear in the file.
         For example, with following lines of Ram Code:
         1  loop with j from (15) to (var1) {
         2      loop with k from 1 to 2 {
@@ -51,13 +89,14 @@ def process_ram(file_lines: list) -> list[Union[Line, Block]]:
         6  }
         7 reset integer var1 to 4
         the call to this function would look like:
-        >>> process_ram([('loop with j from (15) to (var1) {', 1),
+        >>> create_blocks([('loop with j from (15) to (var1) {', 1),
         >>> ... ('loop with k from 1 to 2 {', 2), ('display j + k', 3), ('}', 4),
         >>> ... ('display j', 5), ('}', 6)])
         [Block([('loop with j from (15) to (var1) {', 1), Block([('loop with k from 1 to 2 {', 2),
         Line('display j + k', 3), ('}', 4)]), Line('display j', 5), ('}', 6)]),
         Line('reset integer var1 to 4', 8)]
-        Note the nesting of Blocks and Lines ^ and how empty lines are ignored.
+        Note the nesting of Blocks and Lines ^. Empty lines and comments
+        are removed by source_as_list before this function is called.
         As another example, take the following lines of Ram code:
         1  if (var1) is (0) {
         2      reset integer x to 4 * 3
@@ -70,7 +109,7 @@ def process_ram(file_lines: list) -> list[Union[Line, Block]]:
         9      display 'Hello World!'
         10 }
         and this function would be called this way:
-        >>> process_ram([('if (var1) is (0) {', 1), ('reset integer x to 4 * 3', 2),
+        >>> create_blocks([('if (var1) is (0) {', 1), ('reset integer x to 4 * 3', 2),
         >>> ... ('display "The End"', 3), ('} else if (var1) is (15) {', 4),
         >>> ... ('if (y + 2) is (x) {', 5), ('reset integer y to 2' , 6),
         >>> ... ('display "Reset"', 7), ('}', 8), ('display "Hello World!"', 9), ('}', 10)])
@@ -80,58 +119,180 @@ def process_ram(file_lines: list) -> list[Union[Line, Block]]:
         Line('display "Reset"', 7), ('}', 8)]), Line('display "Hello World!"', 9),
         ('}', 10) ]]
     """
-    # Truncate empty lines and lines with comments
-    file_lines_2 = [line for line in file_lines if line[0] != '' and line[0][0] != '%']
-    return create_blocks(file_lines_2, 1, [])[0]
+    # each entry is (header line, read header, contents),
+    # the bottom entry holds the file
+    stack = [(None, None, [])]
 
+    for line, number in file_lines:
+        contents = stack[-1][2]
 
-def create_blocks(file_lines, line_number, visited: list):
-    """ Parses lines into blocks that hold each line's child
-    """
-    contents = []
-
-    for line_index in range(line_number - 1, len(file_lines)):
-        if file_lines[line_index][1] not in visited:
-            visited.append(file_lines[line_index][1])
-
-            if '{' in file_lines[line_index][0]:
-                if '}' in file_lines[line_index][0]:
-                    contents.append((file_lines[line_index][0], file_lines[line_index][1]))
-                    continue
-
-                block = Block([(file_lines[line_index][0], file_lines[line_index][1])])
-                block.contents, visited = create_blocks(file_lines, line_index + 1, visited)
-                block.block += block.contents
-                block.evaluate_line()
-                contents.append(block)
-
-            elif '}' in file_lines[line_index][0]:
-                # end of block
-                contents.append(('}', file_lines[line_index][1]))
+        if '{' in line:
+            if '}' in line:
+                contents.append((line, number))
+                continue
+
+            stack.append(((line, number), read_block_header(line), []))
+
+        elif '}' in line:
+            # end of block
+            contents.append(('}', number))
+            if len(stack) == 1:
+                # unmatched closing brace, ignore the rest of the file
                 break
 
-            else:
-                # must create a Line
-                line = Line(file_lines[line_index][0], file_lines[line_index][1])
-                contents.append(line)
+            close_block(stack)
+
+        else:
+            # must create a Line
+            contents.append(Line(line, number))
+
+    while len(stack) > 1:
+        # blocks left open at the end of the file end there
+        close_block(stack)
+
+    return stack[0][2]
+
+
+def close_block(stack: list) -> None:
+    """ Pop the innermost open block off stack, build its Block from
+        the header and contents and add it to the contents of its parent.
+    """
+    header_line, block_header, contents = stack.pop()
+    stack[-1][2].append(make_block([header_line] + contents, block_header))
+
+
+@lru_cache(maxsize=None)
+def get_parser_fingerprint() -> bytes:
+    """ Return a hash of the source files in PARSER_SOURCES, including
+        any compiled parser modules, which determine the Module produced
+        for any given Ram code.
+    """
+    digest = hashlib.sha256()
+    root = os.path.dirname(os.path.abspath(__file__))
+    suffixes = tuple(['.py'] + importlib.machinery.EXTENSION_SUFFIXES)
+
+    for name in PARSER_SOURCES:
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            source_paths = sorted(os.path.join(path, file_name) for file_name in os.listdir(path)
+                                  if file_name.endswith(suffixes))
+        else:
+            source_paths = [path]
 
-    return (contents, visited)
+        for source_path in source_paths:
+            with open(source_path, 'rb') as reader:
+                digest.update(reader.read())
+
+    return digest.digest()
+
+
+def get_cache_path(source: bytes) -> Optional[str]:
+    """ Return the path of the cached Module for the given Ram source,
+        or None if the parser cannot be fingerprinted and the cache
+        must not be used.
+    """
+    try:
+        fingerprint = get_parser_fingerprint()
+    except OSError:
+        # e.g. a parser source is missing or unreadable
+        return None
+
+    key = hashlib.sha256(fingerprint + source).hexdigest()
+    return os.path.join(CACHE_DIR, key + '.pkl')
+
+
+def load_cached_module(cache_path: str) -> Optional[Module]:
+    """ Return the Module cached at cache_path, or None if
+        there is no usable cache entry.
+    """
+    try:
+        with open(cache_path, 'rb') as reader:
+            module = pickle.load(reader)
+    except Exception:
+        # missing, unreadable or stale cache entries are simply re-parsed
+        return None
+
+    if not isinstance(module, Module):
+        return None
+
+    try:
+        # mark the entry as recently used so prune_cache keeps it
+        os.utime(cache_path)
+    except OSError:
+        pass
+
+    return module
+
+
+def store_cached_module(cache_path: str, module: Module) -> None:
+    """ Write module to cache_path. The entry is written to a temporary
+        file first and renamed so readers never see a partial entry.
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as writer:
+                pickle.dump(module, writer, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        prune_cache()
+    except Exception:
+        # caching is best effort, a failure must not stop the program
+        pass
+
+
+def prune_cache() -> None:
+    """ Remove the least recently used cache entries
+        until at most CACHE_LIMIT remain.
+    """
+    entries = [os.path.join(CACHE_DIR, file_name) for file_name in os.listdir(CACHE_DIR)
+               if file_name.endswith('.pkl')]
+    if len(entries) <= CACHE_LIMIT:
+        return
+
+    entries.sort(key=os.path.getmtime)
+    for entry in entries[:len(entries) - CACHE_LIMIT]:
+        try:
+            os.remove(entry)
+        except OSError:
+            # another process may have removed it already
+            pass
+
+
+def parse_items(code: list[Union[Line, Block]]) -> list[Statement]:
+    """ Parse each Block and Line in code.
+
+        Items are parsed serially. Lexing and the parsing of block
+        contents already happen while the Lines and Blocks are built,
+        so only a cheap step is left here, and sending items to
+        worker processes costs more than it saves.
+    """
+    return [item.parse() for item in code]
 
 
 def main_parser(file_path: str) -> Module:
     """ Take in file_path and process the code.
         Parse each line/block in the file and return a Module.
+        Parsed Modules are cached on disk, so an unchanged file
+        is only parsed once.
     """
     # attempt to parse code
     try:
-        code = read_file_as_list(file_path)
-        statements = []
-
-        # parse each Block and Line in code
-        for item in code:
-            statements.append(item.parse())
+        # the file is read once, so the cached Module always matches its key
+        source = read_source(file_path)
+        cache_path = get_cache_path(source)
+        if cache_path is not None and (module := load_cached_module(cache_path)) is not None:
+            return module
 
-        return Module(statements)
+        code = source_as_list(source)
+        module = Module(parse_items(code))
+        if cache_path is not None:
+            store_cached_module(cache_path, module)
+        return module
     except Exception as e:
         # raise known RamException
         if isinstance(e, RamException):